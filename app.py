@@ -1,53 +1,169 @@
 # Tandon Associates - Secure Flask Backend
 # This backend fixes all security vulnerabilities identified in audit
-# Production-ready implementation with bcrypt, JWT, and proper validation
+# Production-ready implementation with Argon2id, JWT, and proper validation
 
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, request, jsonify, make_response, abort
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from functools import wraps
+from functools import wraps, lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections import OrderedDict
+from threading import BoundedSemaphore, Lock
 import jwt
+import orjson
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+import redis
+import hashlib
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from dotenv import load_dotenv
 import logging
-import re
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
+import atexit
+import string
 from email_validator import validate_email, EmailNotValidError
+from gevent import monkey
 
 # Load environment variables
 load_dotenv()
 
+class ORJSONProvider(DefaultJSONProvider):
+    '''JSON provider backed by orjson for jsonify() and request.get_json()'''
+
+    # Inherits default, sort_keys, compact and mimetype from DefaultJSONProvider;
+    # its default() encodes types orjson rejects (Decimal, __html__) or formats
+    # differently (dates as HTTP dates)
+
+    @staticmethod
+    def _option(sort_keys: bool, indent) -> int:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            # orjson only supports two-space indentation
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = self._option(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent'))
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping a str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._option(self.sort_keys, indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'dev-key-change-in-production')
 app.config['JWT_SECRET'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
 app.config['JWT_EXPIRATION_HOURS'] = int(os.getenv('JWT_EXPIRATION_HOURS', 24))
+_JWT_KEY_BYTES = app.config['JWT_SECRET'].encode('utf-8')
+JWT_EXP_SECONDS = app.config['JWT_EXPIRATION_HOURS'] * 3600
 app.config['SESSION_TIMEOUT_MINUTES'] = int(os.getenv('SESSION_TIMEOUT_MINUTES', 30))
+app.config['ARGON2_TIME_COST'] = int(os.getenv('ARGON2_TIME_COST', 3))
+app.config['ARGON2_MEMORY_COST'] = int(os.getenv('ARGON2_MEMORY_COST', 64 * 1024))
+app.config['ARGON2_PARALLELISM'] = int(os.getenv('ARGON2_PARALLELISM', 2))
+app.config['REDIS_URL'] = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+app.config['RATELIMIT_STORAGE_URI'] = os.getenv('RATELIMIT_STORAGE_URI', app.config['REDIS_URL'])
+app.config['TRUSTED_PROXIES'] = int(os.getenv('TRUSTED_PROXIES', 0))
 
 # Security configurations
 app.config['SESSION_COOKIE_SECURE'] = True
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Strict'
 
+# TLS is terminated by the reverse proxy; trust its X-Forwarded-* headers so
+# client IPs (rate limiting) and scheme are correct. Only enable behind a proxy.
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app,
+        x_for=app.config['TRUSTED_PROXIES'],
+        x_proto=app.config['TRUSTED_PROXIES'],
+        x_host=app.config['TRUSTED_PROXIES']
+    )
+
 # Enable CORS with restrictions
 CORS(app, resources={r'/api/*': {'origins': os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')}})
 
-# Rate limiting
-limiter = Limiter(app=app, key_func=get_remote_address, default_limits=['200 per day', '50 per hour'])
-
-# Logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log'),
-        logging.StreamHandler()
-    ]
+# Rate limiting (shared Redis counters; moving window avoids fixed-window boundary bursts).
+# Falls back to per-process in-memory counters while Redis is unreachable; storage
+# errors raised by requests already in flight during the switch are swallowed.
+limiter = Limiter(
+    app=app,
+    key_func=get_remote_address,
+    default_limits=['200 per day', '50 per hour'],
+    storage_uri=app.config['RATELIMIT_STORAGE_URI'],
+    strategy='moving-window',
+    in_memory_fallback_enabled=True,
+    swallow_errors=True
+)
+
+class NativeQueueListener(QueueListener):
+    '''QueueListener that always runs on an OS thread, even under gevent'''
+
+    def start(self):
+        # Under gevent, threading.Thread runs as a greenlet on the event loop
+        # thread, which would only defer the log I/O rather than move it off
+        # the loop, so start the monitor with the unpatched _thread primitives
+        self._stopped = monkey.get_original('_thread', 'allocate_lock')()
+        self._stopped.acquire()
+        monkey.get_original('_thread', 'start_new_thread')(self._run, ())
+
+    def _run(self):
+        try:
+            self._monitor()
+        finally:
+            self._stopped.release()
+
+    def stop(self):
+        self.enqueue_sentinel()
+        self._stopped.acquire(timeout=5)
+
+# Logging configuration - request threads only enqueue records; a background
+# OS thread does the console output and file writes. The queue is the C
+# SimpleQueue, whose native lock is safe to share with that thread under gevent.
+# WARNING and above (failed logins, rate-limit hits) reach app.log immediately;
+# INFO records are batched up to 100 at a time, so they can lag at low traffic
+# and up to 99 of them are lost if the worker is killed (SIGKILL/timeout).
+os.makedirs('logs', exist_ok=True)
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+file_handler = logging.FileHandler('logs/app.log', delay=True)
+file_handler.setFormatter(log_formatter)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(log_formatter)
+log_queue = monkey.get_original('queue', 'SimpleQueue')()
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+log_listener = NativeQueueListener(
+    log_queue,
+    MemoryHandler(capacity=100, flushLevel=logging.WARNING, target=file_handler),
+    stream_handler
 )
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
+# Argon2id password hasher (memory-hard, so GPU cracking costs far more than bcrypt)
+password_hasher = PasswordHasher(
+    time_cost=app.config['ARGON2_TIME_COST'],
+    memory_cost=app.config['ARGON2_MEMORY_COST'],
+    parallelism=app.config['ARGON2_PARALLELISM']
+)
+
 # Demo users with HASHED passwords (NOT plaintext!)
 DEMO_USERS = [
     {'id': 1, 'name': 'Demo User', 'email': 'demo@lawfirm.com', 'password_hash': None, 'userType': 'firm', 'role': 'Law Firm'},
@@ -55,29 +171,160 @@ DEMO_USERS = [
     {'id': 3, 'name': 'Corporate Counsel', 'email': 'counsel@corp.com', 'password_hash': None, 'userType': 'corporate', 'role': 'In-House Counsel'}
 ]
 
-# Initialize demo users with hashed passwords on startup
+# Precomputed Argon2id (default parameters) hashes of the demo passwords
+# ('<Localpart>@123'), so worker startup doesn't pay for hashing. Regenerate with:
+#   python -c "from argon2 import PasswordHasher; print(PasswordHasher(3, 65536, 2).hash('Demo@123'))"
+DEMO_HASHES = {
+    'demo@lawfirm.com': '$argon2id$v=19$m=65536,t=3,p=2$zi2v8AFxanqUpGhMxQASag$mZXiDOA9G3Mfm/4xaq+H/1TI5ODUAcNTNIro7KNOnJ0',
+    'solo@attorney.com': '$argon2id$v=19$m=65536,t=3,p=2$1DPuTnO3BtL/KizNO6NKDw$QJC7s5w+TMVlrasumSWay7YM2+UDRcbotV5t6qVXsGM',
+    'counsel@corp.com': '$argon2id$v=19$m=65536,t=3,p=2$DZCvTLIJApMREqmWTHd+zw$qlYkNSFmSqqZIjzCORPAsE31xaLPvQEVjEvCkgYQBAc'
+}
+
+# Attach demo password hashes on startup
 for user in DEMO_USERS:
-    # Hash demo passwords with bcrypt
-    demo_password = f'{user["email"].split("@")[0].title()}@123'
-    user['password_hash'] = bcrypt.hashpw(demo_password.encode('utf-8'), bcrypt.gensalt(12))
+    user['password_hash'] = DEMO_HASHES[user['email']]
 
-# User sessions (in production, use Redis)
-active_sessions = {}
+# Hash of a random throwaway password, checked when the email is unknown so
+# failed lookups cost the same hashing work as wrong passwords
+_DUMMY_HASH = '$argon2id$v=19$m=65536,t=3,p=2$ml6/aL7cfHf+z3nFhZfWLg$3xLcBVRTIsQLdoP4rNKAt1PddKcVk6swAswYIhavN4s'
+if password_hasher.check_needs_rehash(_DUMMY_HASH):
+    # Keep the dummy check as expensive as a real one with the configured parameters
+    _DUMMY_HASH = password_hasher.hash(os.urandom(16).hex())
+
+# O(1) user lookups by lowercased email and by id
+_USERS_BY_EMAIL = {u['email'].lower(): u for u in DEMO_USERS}
+_USERS_BY_ID = {u['id']: u for u in DEMO_USERS}
+
+# User sessions live in Redis so every worker sees the same table and
+# idle sessions expire on their own
+redis_client = redis.Redis(connection_pool=redis.ConnectionPool.from_url(app.config['REDIS_URL']))
+SESSION_TTL_SECONDS = app.config['SESSION_TIMEOUT_MINUTES'] * 60
+
+def session_key(user_id: int) -> str:
+    '''Redis key holding a user's active session'''
+    return f'sess:{user_id}'
+
+# Token bucket refilled lazily on each hit; runs atomically inside Redis
+_TOKEN_BUCKET_LUA = '''
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return allowed
+'''
+_token_bucket = redis_client.register_script(_TOKEN_BUCKET_LUA)
+
+# Password hashing thread pool - argon2 and bcrypt release the GIL, so hashes
+# run in parallel off the request thread
+# Sized per process: Gunicorn exports WEB_CONCURRENCY, so the worker processes
+# together use about one hashing thread per core
+HASH_POOL_WORKERS = int(os.getenv(
+    'HASH_POOL_WORKERS',
+    max(1, (os.cpu_count() or 1) // int(os.getenv('WEB_CONCURRENCY', 1)))
+))
+HASH_TIMEOUT_SECONDS = 2
+# Rough wall time of one hash at the default Argon2id parameters
+HASH_ESTIMATE_SECONDS = 0.25
+if monkey.is_module_patched('threading'):
+    # Under gevent workers stdlib threads are greenlets; use native threads so
+    # hashing doesn't stall the event loop
+    from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+    hash_pool = GeventThreadPoolExecutor(max_workers=HASH_POOL_WORKERS, thread_name_prefix='passwd-hash')
+else:
+    hash_pool = ThreadPoolExecutor(max_workers=HASH_POOL_WORKERS, thread_name_prefix='passwd-hash')
+# Cap queued + running hashes so a login flood fails fast. The default depth is
+# what the pool can finish within the timeout, so bursts queue rather than 503
+# while they can still complete in time
+HASH_QUEUE_DEPTH = int(os.getenv(
+    'HASH_QUEUE_DEPTH',
+    HASH_POOL_WORKERS * max(1, int(HASH_TIMEOUT_SECONDS / HASH_ESTIMATE_SECONDS))
+))
+hash_slots = BoundedSemaphore(HASH_QUEUE_DEPTH)
+
+class HashPoolSaturated(Exception):
+    '''Raised when the hashing pool cannot accept or finish work in time'''
+
+# Password character classes for strength checks (ASCII only)
+_UPPER_CHARS = frozenset(string.ascii_uppercase)
+_LOWER_CHARS = frozenset(string.ascii_lowercase)
+_DIGIT_CHARS = frozenset(string.digits)
+_SPECIAL_CHARS = frozenset('!@#$%^&*(),.?":{}|<>')
+
+# Decoded JWT payloads keyed by token digest, kept until the token's exp
+JWT_CACHE_MAX_ENTRIES = 10000
+_jwt_cache: 'OrderedDict[bytes, tuple[dict, float]]' = OrderedDict()
+_jwt_cache_lock = Lock()
 
 # ============ SECURITY UTILITIES ============
 
-def hash_password(password: str) -> bytes:
-    '''Hash password using bcrypt with 12 rounds'''
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(12))
+def run_hasher(fn, *args):
+    '''Run a password hashing call in the worker pool, failing fast when saturated'''
+    if not hash_slots.acquire(blocking=False):
+        raise HashPoolSaturated('Too many concurrent hashing operations')
+    try:
+        future = hash_pool.submit(fn, *args)
+        return future.result(timeout=HASH_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        future.cancel()
+        raise HashPoolSaturated('Hashing operation timed out')
+    finally:
+        hash_slots.release()
+
+def is_legacy_hash(password_hash: str | bytes) -> bool:
+    '''Check whether a stored hash predates Argon2id (bcrypt $2a$/$2b$/$2y$)'''
+    prefix = password_hash[:2]
+    return prefix in (b'$2', '$2')
+
+def _verify_argon2(password: str, password_hash: str) -> bool:
+    '''Verify against an Argon2 hash, mapping mismatches to False'''
+    try:
+        return password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def hash_password(password: str) -> str:
+    '''Hash password using Argon2id with the configured parameters'''
+    return run_hasher(password_hasher.hash, password)
+
+def verify_password(password: str, password_hash: str | bytes) -> bool:
+    '''Verify password against an Argon2id hash, or a legacy bcrypt hash'''
+    if is_legacy_hash(password_hash):
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode('utf-8')
+        return run_hasher(bcrypt.checkpw, password.encode('utf-8'), password_hash)
+    return run_hasher(_verify_argon2, password, password_hash)
 
-def verify_password(password: str, password_hash: bytes) -> bool:
-    '''Verify password against hash'''
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash)
+def password_needs_rehash(password_hash: str | bytes) -> bool:
+    '''Check whether a stored hash is bcrypt or uses outdated Argon2 parameters'''
+    return is_legacy_hash(password_hash) or password_hasher.check_needs_rehash(password_hash)
+
+# RFC 5321 caps a forward path at 254 characters
+MAX_EMAIL_LENGTH = 254
+
+@lru_cache(maxsize=10000)
+def _cached_validate_email(email: str) -> None:
+    '''Memoized email syntax check - repeat logins skip IDNA normalization'''
+    # Raises EmailNotValidError on bad input; lru_cache does not store
+    # exceptions, so only valid addresses occupy cache slots
+    # MX/deliverability checks belong at registration, not on every login
+    validate_email(email, check_deliverability=False)
 
 def validate_email_format(email: str) -> bool:
-    '''Validate email format using email-validator library'''
+    '''Validate email syntax using email-validator library (no DNS lookups)'''
+    if len(email) > MAX_EMAIL_LENGTH:
+        return False
     try:
-        validate_email(email)
+        _cached_validate_email(email)
         return True
     except EmailNotValidError:
         return False
@@ -86,39 +333,46 @@ def validate_password_strength(password: str) -> tuple[bool, str]:
     '''Validate password strength requirements'''
     if len(password) < 12:
         return False, 'Password must be at least 12 characters'
-    if not re.search(r'[A-Z]', password):
+    if _UPPER_CHARS.isdisjoint(password):
         return False, 'Password must contain uppercase letter'
-    if not re.search(r'[a-z]', password):
+    if _LOWER_CHARS.isdisjoint(password):
         return False, 'Password must contain lowercase letter'
-    if not re.search(r'[0-9]', password):
+    if _DIGIT_CHARS.isdisjoint(password):
         return False, 'Password must contain number'
-    if not re.search(r'[!@#$%^&*(),.?\":{}|<>]', password):
+    if _SPECIAL_CHARS.isdisjoint(password):
         return False, 'Password must contain special character'
     return True, 'Password is strong'
 
-def sanitize_input(data: str) -> str:
-    '''Sanitize input to prevent XSS attacks'''
-    # Remove HTML tags
-    data = re.sub(r'<[^>]*>', '', str(data))
-    # Remove SQL injection patterns
-    data = re.sub(r"[';\"--]", '', data)
-    return data.strip()
-
 def create_jwt_token(user_id: int, user_email: str, user_role: str) -> str:
     '''Create JWT token with expiration'''
+    now = int(time.time())
     payload = {
         'user_id': user_id,
         'email': user_email,
         'role': user_role,
-        'iat': datetime.utcnow(),
-        'exp': datetime.utcnow() + timedelta(hours=app.config['JWT_EXPIRATION_HOURS'])
+        'iat': now,
+        'exp': now + JWT_EXP_SECONDS
     }
-    return jwt.encode(payload, app.config['JWT_SECRET'], algorithm='HS256')
+    return jwt.encode(payload, _JWT_KEY_BYTES, algorithm='HS256')
 
 def verify_jwt_token(token: str) -> dict:
-    '''Verify and decode JWT token'''
+    '''Verify and decode JWT token, reusing cached payloads until they expire'''
+    key = hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+    with _jwt_cache_lock:
+        cached = _jwt_cache.get(key)
+        if cached is not None:
+            if time.time() < cached[1]:
+                _jwt_cache.move_to_end(key)
+                return cached[0]
+            del _jwt_cache[key]
+    
     try:
-        payload = jwt.decode(token, app.config['JWT_SECRET'], algorithms=['HS256'])
+        payload = jwt.decode(token, _JWT_KEY_BYTES, algorithms=['HS256'])
+        if 'exp' in payload:
+            with _jwt_cache_lock:
+                _jwt_cache[key] = (payload, payload['exp'])
+                if len(_jwt_cache) > JWT_CACHE_MAX_ENTRIES:
+                    _jwt_cache.popitem(last=False)
         return payload
     except jwt.ExpiredSignatureError:
         return {'error': 'Token expired', 'code': 401}
@@ -141,8 +395,13 @@ def require_auth(f):
         if 'error' in payload:
             return jsonify(payload), payload.get('code', 401)
         
-        # Check session timeout
-        if payload['user_id'] not in active_sessions:
+        # Check session timeout (refreshing the idle TTL if still active)
+        try:
+            session_active = redis_client.expire(session_key(payload['user_id']), SESSION_TTL_SECONDS)
+        except redis.RedisError as e:
+            logger.error(f'Session store unavailable: {str(e)}')
+            return jsonify({'error': 'Service temporarily unavailable'}), 503
+        if not session_active:
             return jsonify({'error': 'Session expired'}), 401
         
         request.current_user = payload
@@ -163,26 +422,49 @@ def require_role(*roles):
         return decorated_function
     return decorator
 
+def token_bucket_limit(capacity: int, rate: float):
+    '''Decorator to rate limit per client IP with a token bucket (rate in tokens/second)'''
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = f'bucket:{request.endpoint}:{get_remote_address()}'
+            try:
+                allowed = _token_bucket(keys=[key], args=[capacity, rate, time.time()])
+            except redis.RedisError as e:
+                logger.error(f'Rate limit store unavailable: {str(e)}')
+                return jsonify({'error': 'Service temporarily unavailable'}), 503
+            if not allowed:
+                abort(429)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
 # ============ API ENDPOINTS ============
 
 @app.route('/api/health', methods=['GET'])
+@limiter.exempt  # Polled by container healthchecks
 def health_check():
     '''Health check endpoint'''
     return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()}), 200
 
 @app.route('/api/auth/login', methods=['POST'])
-@limiter.limit('5 per minute')  # Rate limit login attempts
+@token_bucket_limit(capacity=10, rate=5 / 60)  # Allow bursts of 10, refill 5 per minute
 def login():
-    '''Secure login endpoint with bcrypt verification'''
+    '''Secure login endpoint with password hash verification'''
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        email = sanitize_input(data.get('email', ''))
+        # No regex scrubbing: validate_email_format rejects malformed addresses,
+        # and output is escaped where it is rendered
+        email = data.get('email', '')
         password = data.get('password', '')
         
         # Validate inputs
+        if not isinstance(email, str) or not isinstance(password, str):
+            return jsonify({'error': 'Email and password must be strings'}), 400
+        email = email.strip()
         if not email or not password:
             logger.warning('Login attempt with missing credentials')
             return jsonify({'error': 'Email and password required'}), 400
@@ -191,27 +473,30 @@ def login():
             logger.warning(f'Login attempt with invalid email format: {email}')
             return jsonify({'error': 'Invalid email format'}), 400
         
-        # Find user
-        user = next((u for u in DEMO_USERS if u['email'].lower() == email.lower()), None)
+        # Find user, always paying for a hash check so timing doesn't reveal if user exists
+        user = _USERS_BY_EMAIL.get(email.lower())
+        password_ok = verify_password(password, user['password_hash'] if user else _DUMMY_HASH)
         if not user:
             logger.warning(f'Login attempt for non-existent user: {email}')
-            # Don't reveal if user exists
             return jsonify({'error': 'Invalid credentials'}), 401
         
-        # Verify password hash
-        if not verify_password(password, user['password_hash']):
+        if not password_ok:
             logger.warning(f'Failed login attempt for user: {email}')
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        # Transparently upgrade bcrypt hashes and outdated Argon2 parameters
+        if password_needs_rehash(user['password_hash']):
+            try:
+                user['password_hash'] = hash_password(password)
+                logger.info(f'Rehashed password for {email} with current Argon2id parameters')
+            except HashPoolSaturated as e:
+                logger.warning(f'Deferred password rehash for {email}: {str(e)}')
+        
         # Create JWT token
         token = create_jwt_token(user['id'], user['email'], user['role'])
         
         # Store active session (with timeout)
-        active_sessions[user['id']] = {
-            'email': user['email'],
-            'login_time': datetime.utcnow(),
-            'last_activity': datetime.utcnow()
-        }
+        redis_client.setex(session_key(user['id']), SESSION_TTL_SECONDS, user['email'])
         
         logger.info(f'Successful login: {email}')
         
@@ -239,6 +524,14 @@ def login():
         
         return response, 200
     
+    except HashPoolSaturated as e:
+        logger.warning(f'Login rejected, hashing pool saturated: {str(e)}')
+        return jsonify({'error': 'Service temporarily unavailable'}), 503
+    
+    except redis.RedisError as e:
+        logger.error(f'Session store unavailable: {str(e)}')
+        return jsonify({'error': 'Service temporarily unavailable'}), 503
+    
     except Exception as e:
         logger.error(f'Login error: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
@@ -248,9 +541,7 @@ def login():
 def logout():
     '''Logout endpoint - invalidates session'''
     try:
-        user_id = request.current_user['user_id']
-        if user_id in active_sessions:
-            del active_sessions[user_id]
+        redis_client.delete(session_key(request.current_user['user_id']))
         
         logger.info(f'User {request.current_user["email"]} logged out')
         
@@ -258,6 +549,10 @@ def logout():
         response.delete_cookie('auth_token')
         return response, 200
     
+    except redis.RedisError as e:
+        logger.error(f'Session store unavailable: {str(e)}')
+        return jsonify({'error': 'Service temporarily unavailable'}), 503
+    
     except Exception as e:
         logger.error(f'Logout error: {str(e)}')
         return jsonify({'error': 'Logout failed'}), 500
@@ -267,7 +562,7 @@ def logout():
 def get_user_profile():
     '''Get authenticated user profile'''
     try:
-        user = next((u for u in DEMO_USERS if u['id'] == request.current_user['user_id']), None)
+        user = _USERS_BY_ID.get(request.current_user['user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -293,6 +588,11 @@ def forbidden(error):
     '''Handle 403 errors'''
     return jsonify({'error': 'Forbidden'}), 403
 
+@app.errorhandler(500)
+def internal_error(error):
+    '''Handle 500 errors'''
+    return jsonify({'error': 'Internal server error'}), 500
+
 @app.errorhandler(429)
 def ratelimit_handler(e):
     '''Handle rate limit errors'''
@@ -300,34 +600,40 @@ def ratelimit_handler(e):
     return jsonify({'error': 'Too many requests'}), 429
 
 # ============ SECURITY HEADERS ============
-@app.after_request
-def set_security_headers(response):
-    '''Add security headers to all responses'''
+# Built once at import; WSGI header names and values are native str (PEP 3333)
+SECURITY_HEADERS = [
     # Content Security Policy
-    response.headers['Content-Security-Policy'] = "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; img-src 'self' data: https:; font-src 'self'; connect-src 'self' http://localhost:5000; frame-ancestors 'none';"
-    
+    ('Content-Security-Policy', "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; img-src 'self' data: https:; font-src 'self'; connect-src 'self' http://localhost:5000; frame-ancestors 'none';"),
     # Prevent clickjacking
-    response.headers['X-Frame-Options'] = 'DENY'
-    
+    ('X-Frame-Options', 'DENY'),
     # Prevent MIME type sniffing
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    
+    ('X-Content-Type-Options', 'nosniff'),
     # Enable XSS protection
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    
+    ('X-XSS-Protection', '1; mode=block'),
     # Referrer policy
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-    
+    ('Referrer-Policy', 'strict-origin-when-cross-origin'),
     # Permissions policy
-    response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=(), payment=()'
-    
-    return response
+    ('Permissions-Policy', 'geolocation=(), microphone=(), camera=(), payment=()')
+]
+
+class SecurityHeadersMiddleware:
+    '''WSGI middleware appending fixed security headers to every response'''
+
+    def __init__(self, wsgi_app, headers):
+        self.wsgi_app = wsgi_app
+        self.headers = headers
 
+    def __call__(self, environ, start_response):
+        def start_with_headers(status, response_headers, exc_info=None):
+            return start_response(status, response_headers + self.headers, exc_info)
+        return self.wsgi_app(environ, start_with_headers)
 
+app.wsgi_app = SecurityHeadersMiddleware(app.wsgi_app, SECURITY_HEADERS)
+
+
+# Development server only - production runs under Gunicorn: gunicorn -c gunicorn_conf.py app:app
 if __name__ == '__main__':
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
     # IMPORTANT: Never run with debug=True in production
+    # Plain HTTP on loopback; put nginx (see nginx.conf) in front for TLS
     debug_mode = os.getenv('FLASK_DEBUG', 'False') == 'True'
-    app.run(host='0.0.0.0', port=5000, debug=debug_mode, ssl_context='adhoc' if not debug_mode else None)
+    app.run(host='127.0.0.1', port=5000, debug=debug_mode)
@@ -0,0 +1,21 @@
+# Tandon Associates - Gunicorn configuration
+# Usage: gunicorn -c gunicorn_conf.py app:app
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# gevent workers serve many requests concurrently per process, so one per
+# core is enough; password hashing runs on native threads so it never blocks
+# the event loop
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gevent'
+# Exported so app.py can split the hashing threads across worker processes
+raw_env = [f'WEB_CONCURRENCY={workers}']
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = 120
+
+# Log to stdout/stderr for container log collection
+accesslog = '-'
+errorlog = '-'